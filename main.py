@@ -2,9 +2,17 @@ import argparse
 import asyncio
 import logging
 import sys
-from typing import List, Optional
+from heapq import nlargest
+from operator import itemgetter
+from typing import FrozenSet, Optional
+
+try:
+    import uvloop
+except ImportError:  # uvloop doesn't support Windows; fall back to the default asyncio loop
+    uvloop = None
 
 from crawler import Crawler
+from crawler.constants import DEFAULT_MAX_BODY_BYTES
 from crawler.utils import process_blacklist_input
 
 
@@ -12,15 +20,31 @@ async def run_crawl():
     parser = argparse.ArgumentParser(description='Simple Async Web Crawler')
     parser.add_argument('start_url', help='The starting URL to crawl')
     parser.add_argument('--max-depth', type=int, default=1, help='Maximum crawl depth (0 means only start URL)')
-    parser.add_argument('--domains', nargs='*', help='List of allowed domains (optional)')
+    parser.add_argument(
+        '--domains',
+        nargs='*',
+        help="List of allowed domains (optional); use '*.example.com' to allow all subdomains of example.com",
+    )
     parser.add_argument(
         '--blacklist',
-        help="Comma-separated list of file extensions (e.g. '.jpg,.png') or path to a file (e.g. 'path/to/blacklist.txt') containing a comma-separated list of extensions to ignore",
+        help="Comma-separated list of file extensions (e.g. '.jpg,.png') or path to a file "
+        "(e.g. 'path/to/blacklist.txt') containing a comma-separated list of extensions to ignore",
     )
-    parser.add_argument('--concurrency', type=int, default=10, help='Number of concurrent workers')
+    parser.add_argument('--concurrency', type=int, default=10, help='Maximum number of URLs processed concurrently')
     parser.add_argument('--timeout', type=float, default=10.0, help='Request timeout in seconds')
     parser.add_argument('--user-agent', help='Custom User-Agent string')
+    parser.add_argument(
+        '--max-body-bytes',
+        type=int,
+        default=DEFAULT_MAX_BODY_BYTES,
+        help='Maximum number of bytes to read from an HTML response body (larger pages are truncated)',
+    )
     parser.add_argument('--output-json', help='File path to save the results as JSON')
+    parser.add_argument(
+        '--output-ndjson',
+        help='File path to stream per-URL results to as NDJSON while crawling '
+        '(they are then omitted from --output-json)',
+    )
     parser.add_argument(
         '--no-verify-ssl', action='store_true', help='Disable SSL certificate verification (use with caution)'
     )
@@ -31,7 +55,7 @@ async def run_crawl():
     args = parser.parse_args()
 
     # blacklist file vs. list handling
-    blacklist_extensions: Optional[List[str]] = None
+    blacklist_extensions: Optional[FrozenSet[str]] = None
 
     try:
         blacklist_extensions = process_blacklist_input(args.blacklist)
@@ -74,11 +98,19 @@ async def run_crawl():
             timeout=args.timeout,
             user_agent=args.user_agent,
             verify_ssl=not args.no_verify_ssl,
+            max_body_bytes=args.max_body_bytes,
+            results_path=args.output_ndjson,
         )
     except ValueError as e:
         logging.error(f'Initialization Error: {e}')
         sys.exit(1)
 
+    try:
+        crawler.open_results_sink()
+    except OSError as e:
+        logging.error(f'Could not open results file: {e}')
+        sys.exit(1)
+
     report = await crawler.crawl()
 
     print('\n' + '=' * 30 + ' Crawl Summary ' + '=' * 30)
@@ -100,10 +132,11 @@ async def run_crawl():
 
     print('\nDomain Counts (Top 10):')
     if report.stats.domain_counts:
-        sorted_domains = sorted(report.stats.domain_counts.items(), key=lambda item: item[1], reverse=True)
-        for domain, count in sorted_domains[:10]:
+        # only the top 10 are shown, so avoid sorting every domain on wide crawls
+        top_domains = nlargest(10, report.stats.domain_counts.items(), key=itemgetter(1))
+        for domain, count in top_domains:
             print(f'  {domain}: {count}')
-        if len(sorted_domains) > 10:
+        if len(report.stats.domain_counts) > 10:
             print('  ...')
     else:
         print('  None')
@@ -122,4 +155,4 @@ async def run_crawl():
 
 
 if __name__ == '__main__':
-    asyncio.run(run_crawl())
+    asyncio.run(run_crawl(), loop_factory=uvloop.new_event_loop if uvloop else None)
@@ -6,49 +6,54 @@ DEFAULT_HEADERS = {
     'Connection': 'keep-alive',
 }
 
+# HTML bodies larger than this are truncated before parsing
+DEFAULT_MAX_BODY_BYTES = 10 * 1024 * 1024
+
 # default extensions to ignore, which can be supplanted by user-supplied blacklist
-DEFAULT_BLACKLIST_EXTENSIONS = {
-    '.css',
-    '.js',
-    '.json',
-    '.xml',
-    '.rss',
-    '.atom',
-    '.txt',
-    '.webmanifest',
-    '.pdf',
-    '.doc',
-    '.docx',
-    '.xls',
-    '.xlsx',
-    '.ppt',
-    '.pptx',
-    '.zip',
-    '.gz',
-    '.rar',
-    '.tar',
-    '.7z',
-    '.exe',
-    '.dmg',
-    '.iso',
-    '.png',
-    '.jpg',
-    '.jpeg',
-    '.gif',
-    '.svg',
-    '.webp',
-    '.ico',
-    '.bmp',
-    '.mp4',
-    '.avi',
-    '.mov',
-    '.wmv',
-    '.mp3',
-    '.wav',
-    '.ogg',
-    '.woff',
-    '.woff2',
-    '.ttf',
-    '.otf',
-    '.eot',
-}
+DEFAULT_BLACKLIST_EXTENSIONS = frozenset(
+    {
+        '.css',
+        '.js',
+        '.json',
+        '.xml',
+        '.rss',
+        '.atom',
+        '.txt',
+        '.webmanifest',
+        '.pdf',
+        '.doc',
+        '.docx',
+        '.xls',
+        '.xlsx',
+        '.ppt',
+        '.pptx',
+        '.zip',
+        '.gz',
+        '.rar',
+        '.tar',
+        '.7z',
+        '.exe',
+        '.dmg',
+        '.iso',
+        '.png',
+        '.jpg',
+        '.jpeg',
+        '.gif',
+        '.svg',
+        '.webp',
+        '.ico',
+        '.bmp',
+        '.mp4',
+        '.avi',
+        '.mov',
+        '.wmv',
+        '.mp3',
+        '.wav',
+        '.ogg',
+        '.woff',
+        '.woff2',
+        '.ttf',
+        '.otf',
+        '.eot',
+    }
+)
@@ -1,19 +1,74 @@
 import asyncio
+import codecs
 import datetime
+import html
 import logging
+import re
 import time
-from typing import List, Optional, Set
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Deque, FrozenSet, Iterable, List, Optional, Set, Tuple
 
 import httpx
-from bs4 import BeautifulSoup
-
-from .constants import DEFAULT_BLACKLIST_EXTENSIONS, DEFAULT_HEADERS
-from .models import CrawlReport, CrawlResult, CrawlStats
-from .utils import get_domain, is_valid_url, normalize_url
+import orjson
+import xxhash
+
+from .constants import DEFAULT_BLACKLIST_EXTENSIONS, DEFAULT_HEADERS, DEFAULT_MAX_BODY_BYTES
+from .models import CrawlReport, CrawlStats, RawCrawlResult
+from .utils import (
+    clean_link,
+    compile_blacklist_pattern,
+    get_domain,
+    get_extension,
+    is_valid_url,
+    is_valid_url_many,
+    normalize_url,
+)
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [%(name)s] %(message)s')
 logger = logging.getLogger(__name__)
 
+# link discovery only needs href values and the title, so scan the raw bytes rather than building a parse tree;
+# `href` must follow whitespace so attributes like `data-href` aren't picked up
+_HREF_RE = re.compile(rb"""<a\s(?:[^>]*?\s)?href\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""", re.IGNORECASE)
+_TITLE_RE = re.compile(rb'<title[^>]*>(.*?)</title>', re.IGNORECASE | re.DOTALL)
+# hrefs that never lead to a crawlable page; checked before paying for urljoin/urlsplit
+_SKIPPED_HREF_PREFIXES = ('mailto:', 'javascript:', 'tel:', 'data:')
+# covers both <meta charset="..."> and <meta http-equiv="Content-Type" content="text/html; charset=...">
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?([\w.:-]+)', re.IGNORECASE)
+# a regex alternation is matched branch by branch, so past this many extensions a set lookup on the parsed
+# extension is faster
+_BLACKLIST_PATTERN_MAX_EXTENSIONS = 256
+
+
+def _url_key(url: str) -> int:
+    """Stable 64-bit hash of a URL, used for visited/enqueued bookkeeping"""
+    return xxhash.xxh3_64_intdigest(url.encode('utf-8'))
+
+
+def _detect_encoding(content: bytes, declared: Optional[str] = None) -> str:
+    """
+    Pick the codec for an HTML document: the charset declared in the Content-Type header, then a <meta> charset
+    declaration near the start of the document, then UTF-8.
+    """
+    candidates = [declared]
+    if meta_match := _META_CHARSET_RE.search(content, 0, 1024):
+        candidates.append(meta_match.group(1).decode('ascii'))
+
+    for candidate in candidates:
+        if candidate:
+            try:
+                return codecs.lookup(candidate).name
+            except LookupError:
+                pass
+    return 'utf-8'
+
+
+def _decode_html_text(raw: bytes, encoding: str = 'utf-8') -> str:
+    """Decode a snippet of raw HTML (attribute value or element text), resolving character references"""
+    text = raw.decode(encoding, 'replace')
+    return html.unescape(text) if '&' in text else text
+
 
 class Crawler:
     def __init__(
@@ -21,11 +76,13 @@ class Crawler:
         start_url: str,
         max_depth: int = 2,
         allowed_domains: Optional[List[str]] = None,
-        blacklist_extensions: Optional[List[str]] = None,
+        blacklist_extensions: Optional[Iterable[str]] = None,
         concurrency: int = 10,
         timeout: float = 10.0,
         user_agent: Optional[str] = None,
         verify_ssl: bool = True,
+        max_body_bytes: int = DEFAULT_MAX_BODY_BYTES,
+        results_path: Optional[str] = None,
     ):
         _start_url_normalized = normalize_url(start_url, start_url)
         if not _start_url_normalized:
@@ -36,30 +93,50 @@ class Crawler:
             raise ValueError('max_depth cannot be negative')
         self.max_depth = max_depth
 
-        self.allowed_domains: Optional[Set[str]] = set(allowed_domains) if allowed_domains else None
+        # frozen, since these are only ever membership-tested once the crawl starts
+        # lowercased to match get_domain, since hosts are case-insensitive
+        self.allowed_domains: Optional[FrozenSet[str]] = (
+            frozenset(domain.lower() for domain in allowed_domains) if allowed_domains else None
+        )
 
+        self.blacklist_extensions: FrozenSet[str]
         if blacklist_extensions is not None:
-            self.blacklist_extensions = set(blacklist_extensions)
-            logger.info(f'Using provided blacklist extensions: {self.blacklist_extensions}')
+            self.blacklist_extensions = frozenset(blacklist_extensions)
+            logger.info(f'Using provided blacklist extensions: {sorted(self.blacklist_extensions)}')
         else:
-            self.blacklist_extensions = DEFAULT_BLACKLIST_EXTENSIONS.copy()
+            self.blacklist_extensions = DEFAULT_BLACKLIST_EXTENSIONS
             logger.info(f'Using default blacklist extensions (count: {len(self.blacklist_extensions)})')
 
+        self._blacklist_re = (
+            compile_blacklist_pattern(self.blacklist_extensions)
+            if len(self.blacklist_extensions) <= _BLACKLIST_PATTERN_MAX_EXTENSIONS
+            else None
+        )
+
         self.concurrency = max(1, concurrency)
         self.timeout = timeout
         self.verify_ssl = verify_ssl
+        if max_body_bytes <= 0:
+            raise ValueError('max_body_bytes must be positive')
+        self.max_body_bytes = max_body_bytes
+        # when set, per-URL results are streamed to this file as NDJSON instead of being held in memory for the report
+        self.results_path = results_path
         self.headers = DEFAULT_HEADERS.copy()
         if user_agent:
             self.headers['User-Agent'] = user_agent
 
-        self._queue: asyncio.Queue = asyncio.Queue()
-        self._visited_urls: Set[str] = set()
-        self._results: List[CrawlResult] = []
-        self._stats = CrawlStats()
+        # URLs waiting to be crawled; a task is only created for one once a concurrency slot frees up
+        self._frontier: Deque[Tuple[str, int]] = deque()
+        # URL hashes rather than full strings to keep memory flat on large crawls
+        self._enqueued: Set[int] = set()
+        self._results: List[RawCrawlResult] = []
+        self._results_sink: Optional[BinaryIO] = None
+        self._stats = CrawlStats.model_construct()
+        # hot-path tallies, copied into self._stats when the crawl finishes
+        self._domain_counts: Counter[str] = Counter()
+        self._status_code_counts: Counter[int] = Counter()
         self._active_tasks: Set[asyncio.Task] = set()
-
-        # Semaphore to limit concurrent requests
-        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._parse_executor: Optional[ThreadPoolExecutor] = None
 
         logger.info('Crawler initialized:')
         logger.info(f'  Start URL: {self.start_url}')
@@ -67,44 +144,95 @@ class Crawler:
         logger.info(f'  Allowed Domains: {self.allowed_domains or "Any"}')
         logger.info(f'  Blacklisted Extensions Count: {len(self.blacklist_extensions)}')
         logger.info(f'  Concurrency: {self.concurrency}, Timeout: {self.timeout}s, Verify SSL: {self.verify_ssl}')
+        logger.info(f'  Max Body Size: {self.max_body_bytes} bytes')
+        logger.info(f'  Results File: {self.results_path or "None (kept in memory)"}')
 
-    async def _worker(self, worker_id: int, client: httpx.AsyncClient):
-        """Worker task to process URLs from the queue"""
-
-        logger.debug(f'Worker {worker_id} starting.')
-        while True:
-            try:
-                # wait for an item from the queue
-                current_url, current_depth = await self._queue.get()
-                logger.debug(f'Worker {worker_id} got URL: {current_url} (depth {current_depth})')
+    async def _dispatch(self, client: httpx.AsyncClient):
+        """Run one task per frontier URL, keeping at most `concurrency` in flight until the frontier is drained"""
 
-                # double-check if visited (might have been visited by another worker between adding to queue and processing)
-                if current_url in self._visited_urls:
-                    self._queue.task_done()
+        try:
+            while self._frontier or self._active_tasks:
+                while self._frontier and len(self._active_tasks) < self.concurrency:
+                    url, depth = self._frontier.popleft()
+                    self._active_tasks.add(asyncio.create_task(self._process_url(client, url, depth)))
+
+                done, self._active_tasks = await asyncio.wait(self._active_tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    # _process_url handles its own errors, so anything surfacing here is unexpected
+                    exc = task.exception()
+                    if exc:
+                        logger.error(f'Critical error processing URL: {exc}', exc_info=exc)
+                        self._stats.total_errors_processing += 1
+        finally:
+            for task in self._active_tasks:
+                task.cancel()
+            # let the cancelled tasks unwind (and write their results) before crawl() closes the sink and client
+            await asyncio.gather(*self._active_tasks, return_exceptions=True)
+            self._active_tasks.clear()
+
+    def _extract_links_and_title(
+        self, content: bytes, base_url: str, extract_links: bool = True, encoding: Optional[str] = None
+    ) -> Tuple[Optional[str], List[str]]:
+        """
+        Scan an HTML document for its title and the normalized links on it that pass the crawl filters.
+
+        The document is never decoded as a whole; only the matched title and href snippets are, using `encoding`
+        (e.g. the Content-Type charset) or the document's own <meta> charset declaration.
+
+        This is synchronous and runs on the parse thread pool rather than the event loop.
+        """
+        encoding = _detect_encoding(content, encoding)
+        title_match = _TITLE_RE.search(content)
+        title = (_decode_html_text(title_match.group(1), encoding).strip() or None) if title_match else None
+
+        links: List[str] = []
+        if not extract_links:
+            return title, links
+
+        seen: Set[str] = set()
+        candidates: List[str] = []
+        for href_match in _HREF_RE.finditer(content):
+            href = _decode_html_text(href_match.group(1) or href_match.group(2) or href_match.group(3) or b'', encoding)
+            # clean first, so a split-up extension like '.j\npg' can't get past the blacklist below
+            href = clean_link(href)
+            if not href or href[0] == '#' or href[:11].lower().startswith(_SKIPPED_HREF_PREFIXES):
+                continue
+            # a single regex match on the raw href covers the whole blacklist, and spares blacklisted links the urljoin
+            if self._blacklist_re:
+                if self._blacklist_re.match(href):
+                    logger.debug(f'Filtered Link: {href}')
                     continue
-
-                # add to visited before processing to prevent re-queueing
-                self._visited_urls.add(current_url)
-
-                # acquire semaphore before making request
-                async with self._semaphore:
-                    await self._process_url(client, current_url, current_depth)
-
-                self._queue.task_done()
-
-            except asyncio.CancelledError:
-                logger.debug(f'Worker {worker_id} was cancelled.')
+            elif self.blacklist_extensions and get_extension(href) in self.blacklist_extensions:
+                logger.debug(f'Filtered Link: {href}')
+                continue
+
+            normalized_url = normalize_url(base_url, href)
+            if not normalized_url or normalized_url in seen:
+                continue
+            seen.add(normalized_url)
+            candidates.append(normalized_url)
+
+        # extensions were already checked against the raw hrefs above; links repeated across pages hit the cache
+        for normalized_url, valid in zip(candidates, is_valid_url_many(candidates, self.allowed_domains)):
+            if valid:
+                links.append(normalized_url)
+            else:
+                logger.debug(f'Filtered Link: {normalized_url}')
+
+        return title, links
+
+    async def _read_body(self, response: httpx.Response) -> bytes:
+        """Read a streamed response body, stopping once more than max_body_bytes have been received"""
+        chunks: List[bytes] = []
+        received = 0
+        async for chunk in response.aiter_bytes():
+            chunks.append(chunk)
+            received += len(chunk)
+            if received > self.max_body_bytes:
+                logger.warning(f'Body of {response.url} exceeds {self.max_body_bytes} bytes, truncating')
                 break
-            except Exception as e:
-                logger.error(f'Critical error in worker {worker_id} loop: {e}', exc_info=True)
-                self._stats.total_errors_processing += 1
 
-                try:
-                    self._queue.task_done()
-                except ValueError:
-                    pass
-
-        logger.debug(f'Worker {worker_id} finished.')
+        return b''.join(chunks)[: self.max_body_bytes]
 
     async def _process_url(self, client: httpx.AsyncClient, url: str, depth: int):
         """Fetch, parse, and process a single URL."""
@@ -112,43 +240,48 @@ class Crawler:
         self._stats.total_urls_processed += 1
         domain = get_domain(url)
         if domain:
-            self._stats.domain_counts[domain] = self._stats.domain_counts.get(domain, 0) + 1
+            self._domain_counts[domain] += 1
 
-        result = CrawlResult(url=url, depth=depth)
+        result = RawCrawlResult(url=url, depth=depth)
 
         try:
             logger.info(f'Fetching: {url} (Depth: {depth})')
-            response = await client.get(url, follow_redirects=True)
-
-            result.status_code = response.status_code
-            result.content_size = len(response.content)
-            self._stats.status_code_counts[response.status_code] = (
-                self._stats.status_code_counts.get(response.status_code, 0) + 1
-            )
+            body = b''
+            async with client.stream('GET', url, follow_redirects=True) as response:
+                result.status_code = response.status_code
+                self._status_code_counts[response.status_code] += 1
+
+                # only download bodies we're going to parse; for anything else report the advertised size
+                content_type = response.headers.get('content-type', '').lower()
+                is_html = 'text/html' in content_type
+                if is_html:
+                    body = await self._read_body(response)
+                    result.content_size = len(body)
+                else:
+                    content_length = response.headers.get('content-length', '')
+                    result.content_size = int(content_length) if content_length.isdigit() else None
 
             response.raise_for_status()
 
-            content_type = response.headers.get('content-type', '').lower()
-            if 'text/html' in content_type:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                title_tag = soup.find('title')
-                if title_tag and title_tag.string:
-                    result.title = title_tag.string.strip()
-
-                if depth < self.max_depth:
-                    links = soup.find_all('a', href=True)
-                    for link_tag in links:
-                        href = link_tag['href']
-                        normalized_url = normalize_url(url, href)
-
-                        if normalized_url and normalized_url not in self._visited_urls:
-                            if is_valid_url(normalized_url, self.allowed_domains, self.blacklist_extensions):
-                                # check visited again right before putting (minimal race condition window)
-                                if normalized_url not in self._visited_urls:
-                                    logger.debug(f'Queueing Link: {normalized_url} (Depth: {depth + 1})')
-                                    await self._queue.put((normalized_url, depth + 1))
-                            else:
-                                logger.debug(f'Filtered Link: {normalized_url}')
+            if is_html:
+                # parsing is CPU-bound, so run it on the parse pool to keep the event loop free for I/O
+                loop = asyncio.get_running_loop()
+                title, links = await loop.run_in_executor(
+                    self._parse_executor,
+                    self._extract_links_and_title,
+                    body,
+                    url,
+                    depth < self.max_depth,
+                    response.charset_encoding,
+                )
+                result.title = title
+
+                for link in links:
+                    url_key = _url_key(link)
+                    if url_key not in self._enqueued:
+                        logger.debug(f'Queueing Link: {link} (Depth: {depth + 1})')
+                        self._enqueued.add(url_key)
+                        self._frontier.append((link, depth + 1))
             else:
                 logger.debug(f'Non-HTML content skipped for link extraction: {url} ({content_type})')
 
@@ -165,13 +298,31 @@ class Crawler:
             self._stats.total_errors_processing += 1
         finally:
             result.timestamp = datetime.datetime.now(datetime.timezone.utc)
-            self._results.append(result)
+            if self._results_sink:
+                self._results_sink.write(orjson.dumps(result, option=orjson.OPT_APPEND_NEWLINE))
+            else:
+                self._results.append(result)
+
+    def open_results_sink(self):
+        """
+        Open the NDJSON results file, if one was requested. `crawl` does this itself when needed; calling it first
+        lets file errors (OSError) surface before any requests are made.
+        """
+        if self.results_path and not self._results_sink:
+            self._results_sink = open(self.results_path, 'wb', buffering=1024 * 1024)
+            logger.info(f'Streaming results to {self.results_path}')
+
+    def _close_results_sink(self):
+        if self._results_sink:
+            self._results_sink.close()
+            self._results_sink = None
 
     async def crawl(self) -> CrawlReport:
         """Starts the crawling process and returns the report."""
 
         if not is_valid_url(self.start_url, self.allowed_domains, self.blacklist_extensions):
             logger.error(f'Start URL {self.start_url} is invalid or does not match crawl criteria.')
+            self._close_results_sink()
 
             return CrawlReport(
                 start_url=self.start_url,
@@ -185,35 +336,44 @@ class Crawler:
         self._stats.start_time = datetime.datetime.now(datetime.timezone.utc)
         start_perf = time.perf_counter()
 
-        await self._queue.put((self.start_url, 0))
-
-        # single shared httpx client session for all workers
-        async with httpx.AsyncClient(
-            headers=self.headers,
-            timeout=self.timeout,
-            verify=self.verify_ssl,
-            follow_redirects=True,
-            limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
-        ) as client:
-            worker_tasks = []
+        self._enqueued.add(_url_key(self.start_url))
+        self._frontier.append((self.start_url, 0))
 
-            for i in range(self.concurrency):
-                task = asyncio.create_task(self._worker(i, client), name=f'worker-{i}')
-                worker_tasks.append(task)
+        self.open_results_sink()
 
-            await self._queue.join()
-            logger.info('All items processed from queue.')
-
-            logger.info('Cancelling worker tasks...')
-            for task in worker_tasks:
-                task.cancel()
+        # bounded thread pool for HTML parsing, kept separate from the loop's default executor
+        self._parse_executor = ThreadPoolExecutor(
+            max_workers=min(32, self.concurrency), thread_name_prefix='crawler-parse'
+        )
 
-            await asyncio.gather(*worker_tasks, return_exceptions=True)
-            logger.info('All worker tasks finished cancellation.')
+        # single shared httpx client session for all requests
+        try:
+            # HTTP/2 multiplexes same-host requests over one TLS connection; the pool is allowed some headroom over
+            # `concurrency` so keepalive connections to busy hosts aren't evicted to open one to a new host
+            async with httpx.AsyncClient(
+                http2=True,
+                headers=self.headers,
+                timeout=httpx.Timeout(self.timeout, connect=min(self.timeout, 5.0)),
+                verify=self.verify_ssl,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=self.concurrency * 2,
+                    max_keepalive_connections=self.concurrency,
+                    keepalive_expiry=30.0,
+                ),
+            ) as client:
+                await self._dispatch(client)
+                logger.info('All URLs in the frontier processed.')
+        finally:
+            self._parse_executor.shutdown(wait=False, cancel_futures=True)
+            self._parse_executor = None
+            self._close_results_sink()
 
         end_perf = time.perf_counter()
         self._stats.end_time = datetime.datetime.now(datetime.timezone.utc)
         self._stats.duration_seconds = round(end_perf - start_perf, 2)
+        self._stats.domain_counts = dict(self._domain_counts)
+        self._stats.status_code_counts = dict(self._status_code_counts)
 
         logger.info(f'Crawling finished in {self._stats.duration_seconds:.2f} seconds.')
         logger.info(f'Total URLs processed: {self._stats.total_urls_processed}')
@@ -225,7 +385,7 @@ class Crawler:
             max_depth=self.max_depth,
             allowed_domains=list(self.allowed_domains) if self.allowed_domains else None,
             blacklist_extensions=sorted(list(self.blacklist_extensions)),
-            results=self._results,
+            results=[result.to_result() for result in self._results],
             stats=self._stats,
         )
         return report
@@ -1,4 +1,5 @@
 import datetime
+from dataclasses import dataclass
 from typing import Dict, List, Optional
 
 from pydantic import BaseModel
@@ -16,6 +17,28 @@ class CrawlResult(BaseModel):
     url: str
 
 
+@dataclass(slots=True)
+class RawCrawlResult:
+    """
+    Lightweight record filled in while a URL is crawled.
+
+    Values are produced internally, so this skips pydantic validation on the hot path; records are converted to
+    `CrawlResult` when the report is assembled.
+    """
+
+    url: str
+    depth: int
+    content_size: Optional[int] = None
+    error: Optional[str] = None
+    status_code: Optional[int] = None
+    timestamp: Optional[datetime.datetime] = None
+    title: Optional[str] = None
+
+    def to_result(self) -> CrawlResult:
+        """Convert to a `CrawlResult`, skipping validation since the values were produced internally"""
+        return CrawlResult.model_construct(**{name: getattr(self, name) for name in self.__slots__})
+
+
 class CrawlStats(BaseModel):
     """Overall statistics for a single crawl"""
 
@@ -1,71 +1,326 @@
 import logging
 import os
-from typing import List, Optional, Set
-from urllib.parse import urljoin, urlparse
+import re
+import string
+import sys
+from functools import lru_cache
+from typing import AbstractSet, Dict, FrozenSet, Iterable, List, Optional, Tuple
+from urllib.parse import SplitResult, urljoin, urlsplit
 
 logger = logging.getLogger(__name__)
 
+_SCHEME_CHARS = frozenset(string.ascii_letters + string.digits + '+.-')
+# urlsplit silently drops tabs and newlines anywhere in a URL, so they're deleted up front in one C-level pass; spaces
+# are significant inside a URL and are left alone
+_WS_TABLE = str.maketrans('', '', '\t\n\r')
+# urlsplit strips these from the start of a URL
+_C0_CONTROL_OR_SPACE = ''.join(map(chr, range(0x21)))
+# IPv6 brackets need urlsplit's validation, so links containing them skip the string fast path
+_URL_SPECIAL_CHARS = frozenset('[]')
+_HTTP_PREFIXES = ('http://', 'https://')
+# blacklist entries are separated by commas and/or any whitespace (including newlines in files)
+_BLACKLIST_SPLIT_RE = re.compile(r'[,\s]+')
 
-def get_domain(url: str) -> Optional[str]:
-    """Extract the netloc (domain) from a URL"""
-    if not url:
+
+def _scheme_length(url: str) -> int:
+    """Return the length of the URL's explicit scheme (without the colon), or 0 if it has none"""
+    colon = url.find(':')
+    if colon <= 0:
+        return 0
+
+    scheme = url[:colon]
+    if not (scheme[0].isalpha() and scheme.isascii() and _SCHEME_CHARS.issuperset(scheme)):
+        return 0  # the colon is part of a path or query, not a scheme
+    return colon
+
+
+@lru_cache(maxsize=65536)
+def _parse_cached(url: str) -> SplitResult:
+    """`urlsplit`, memoized: a URL is validated, then counted by domain, and linked to from many pages"""
+    return urlsplit(url)
+
+
+def _parsed_domain(parsed: SplitResult) -> Optional[str]:
+    """Extract the netloc (domain) from an already-parsed URL"""
+    if parsed.netloc:
+        # hosts are case-insensitive; interning makes the many repeats of a domain share one string object
+        return sys.intern(parsed.netloc.lower())
+    else:
         return None
 
-    try:
-        parsed = urlparse(url)
-        if parsed.netloc:
-            return parsed.netloc
-        else:
+
+@lru_cache(maxsize=65536)
+def get_domain(url: str, _parsed: Optional[SplitResult] = None) -> Optional[str]:
+    """Extract the netloc (domain) from a URL, or from its already-parsed `_parsed` form"""
+    if _parsed is None:
+        if not url:
             return None
-    except ValueError:
-        return None
 
+        try:
+            _parsed = _parse_cached(url)
+        except ValueError:
+            return None
 
-def get_extension(url: str) -> Optional[str]:
-    """Extract the file extension from the URL path"""
-    try:
-        parsed = urlparse(url)
-        path = parsed.path
-        if path:
-            _, ext = os.path.splitext(path)
-            return ext.lower() if ext else None
+    return _parsed_domain(_parsed)
+
+
+def _path_extension(path: str) -> Optional[str]:
+    """Extract the file extension from an already-parsed URL path"""
+    # ';params' on the last segment (e.g. ';jsessionid=...') aren't part of the file name, and leading dots mark
+    # hidden files (e.g. '.config'), not extensions
+    last_segment = path.rpartition('/')[2].partition(';')[0].lstrip('.')
+    if '.' not in last_segment:
         return None
-    except ValueError:
+
+    ext = last_segment.rpartition('.')[2]
+    return '.' + ext.lower() if ext else None
+
+
+@lru_cache(maxsize=65536)
+def get_extension(url: str, _parsed: Optional[SplitResult] = None) -> Optional[str]:
+    """Extract the file extension from the URL path, or from its already-parsed `_parsed` form"""
+    if _parsed is not None:
+        return _path_extension(_parsed.path)
+
+    path = url.partition('#')[0].partition('?')[0]
+    scheme_length = _scheme_length(path)
+    if scheme_length:
+        path = path[scheme_length + 1 :]
+
+    # drop the '//authority', which never holds an extension ('http://example.com' has an empty path)
+    if path.startswith('//'):
+        path_start = path.find('/', 2)
+        path = path[path_start:] if path_start != -1 else ''
+
+    return _path_extension(path)
+
+
+def compile_blacklist_pattern(blacklist_extensions: Iterable[str]) -> Optional[re.Pattern]:
+    """
+    Compile blacklist extensions into a single case-insensitive pattern, matched against a (possibly relative) URL.
+
+    The pattern matches when the last segment of the URL's path ends in one of the extensions, mirroring
+    `get_extension`: query strings, fragments and ';params' are ignored, as are hidden files like '/.config' and bare
+    'scheme://host' URLs, which have no path. Returns None if there are no extensions to match.
+    """
+    extensions = {ext[1:] for ext in blacklist_extensions if ext.startswith('.') and len(ext) > 1}
+    if not extensions:
         return None
 
+    alternation = '|'.join(re.escape(ext) for ext in sorted(extensions, key=len, reverse=True))
+    return re.compile(
+        r'(?!(?:[a-z][a-z0-9+.-]*:)?//[^/?#]*(?:[?#]|$))'  # no path at all
+        r'(?:[^?#]*/)?\.*[^./?#;]'  # up to the first non-dot character of the last path segment
+        rf'[^/?#;]*\.(?:{alternation})(?=(?:;[^/?#]*)?(?:[?#]|$))',  # ';params' end the file name
+        re.IGNORECASE,
+    )
+
+
+def _domain_allowed(domain: str, allowed_domains: AbstractSet[str]) -> bool:
+    """
+    Check a domain against an allowed set of exact domains and '*.'-prefixed wildcard entries.
+
+    A wildcard entry such as '*.example.com' allows any subdomain of example.com. Rather than testing every entry, we
+    look up each parent suffix of the domain, so the cost scales with the number of labels, not allowed domains.
+    """
+    if domain in allowed_domains:
+        return True
+
+    suffix = domain
+    while (dot := suffix.find('.')) != -1:
+        suffix = suffix[dot + 1 :]
+        if '*.' + suffix in allowed_domains:
+            return True
+    return False
+
+
+def _has_http_prefix(url: str) -> bool:
+    """
+    Check the URL starts with 'http://' or 'https://'. The slower retry tolerates what urlsplit would: an uppercase
+    scheme, leading spaces/control characters and embedded tabs/newlines (e.g. ' HTTP://...')
+    """
+    if url.startswith(_HTTP_PREFIXES):
+        return True
+    return url.lstrip(_C0_CONTROL_OR_SPACE)[:16].translate(_WS_TABLE)[:8].lower().startswith(_HTTP_PREFIXES)
+
+
+@lru_cache(maxsize=32)
+def _lowercase_frozen_domains(allowed_domains: FrozenSet[str]) -> FrozenSet[str]:
+    lowered = frozenset(domain.lower() for domain in allowed_domains)
+    # hand back the same object when nothing changed, so it keeps hitting the same _is_valid_url_cached entries
+    return allowed_domains if lowered == allowed_domains else lowered
+
+
+def _lowercase_domains(allowed_domains: AbstractSet[str]) -> AbstractSet[str]:
+    """Lowercase an allowed-domains filter to match `get_domain`, keeping plain sets as (uncached) sets"""
+    if isinstance(allowed_domains, frozenset):
+        return _lowercase_frozen_domains(allowed_domains)
+    return {domain.lower() for domain in allowed_domains}
+
 
 def is_valid_url(
-    url: str, allowed_domains: Optional[Set[str]] = None, blacklist_extensions: Optional[Set[str]] = None
+    url: str,
+    allowed_domains: Optional[FrozenSet[str]] = None,
+    blacklist_extensions: Optional[FrozenSet[str]] = None,
+    parsed: Optional[SplitResult] = None,
 ) -> bool:
-    """Check if a URL is valid based on scheme, domain, and extension"""
-    try:
-        parsed = urlparse(url)
+    """
+    Check if a URL is valid based on scheme, domain, and extension
+
+    `allowed_domains` and `blacklist_extensions` should be frozensets (plain sets also work), built once by the
+    caller, so each lookup is O(1). Hosts and allowed domains are compared case-insensitively. A pre-parsed
+    `urlsplit` result for the URL may be supplied to avoid parsing it again.
+    """
+    assert allowed_domains is None or isinstance(allowed_domains, (set, frozenset)), 'allowed_domains must be a set'
+    assert blacklist_extensions is None or isinstance(blacklist_extensions, (set, frozenset)), (
+        'blacklist_extensions must be a set'
+    )
+
+    # reject mailto:, ftp:, relative links, ... before paying for a parse
+    if not _has_http_prefix(url):
+        return False
+
+    if allowed_domains:
+        allowed_domains = _lowercase_domains(allowed_domains)
 
-        if parsed.scheme not in ('http', 'https'):
+    if parsed is None:
+        # frozensets are hashable, so repeat checks of a URL against the same filters can come from the cache
+        if not isinstance(allowed_domains, set) and not isinstance(blacklist_extensions, set):
+            return _is_valid_url_cached(url, allowed_domains, blacklist_extensions)
+
+        try:
+            parsed = urlsplit(url)
+        except ValueError:
             return False
 
-        if allowed_domains:
-            domain = parsed.netloc
+    return _check_url(parsed, allowed_domains, blacklist_extensions)
 
-            if not domain or domain not in allowed_domains:
-                return False
 
-        if blacklist_extensions:
-            ext = get_extension(url)
+def is_valid_url_many(
+    urls: Iterable[str],
+    allowed_domains: Optional[FrozenSet[str]] = None,
+    blacklist_extensions: Optional[FrozenSet[str]] = None,
+) -> List[bool]:
+    """
+    Check a batch of URLs with the same rules as `is_valid_url`, returning one flag per URL
 
-            if ext and ext in blacklist_extensions:
-                return False
+    The filter checks and cache dispatch are done once for the whole batch instead of once per URL.
+    """
+    assert allowed_domains is None or isinstance(allowed_domains, (set, frozenset)), 'allowed_domains must be a set'
+    assert blacklist_extensions is None or isinstance(blacklist_extensions, (set, frozenset)), (
+        'blacklist_extensions must be a set'
+    )
 
-        return True
+    if isinstance(allowed_domains, set) or isinstance(blacklist_extensions, set):
+        return [is_valid_url(url, allowed_domains, blacklist_extensions) for url in urls]
+
+    if allowed_domains:
+        allowed_domains = _lowercase_domains(allowed_domains)
+
+    check = _is_valid_url_cached
+    return [_has_http_prefix(url) and check(url, allowed_domains, blacklist_extensions) for url in urls]
+
+
+@lru_cache(maxsize=65536)
+def _is_valid_url_cached(
+    url: str,
+    allowed_domains: Optional[FrozenSet[str]],
+    blacklist_extensions: Optional[FrozenSet[str]],
+) -> bool:
+    try:
+        parsed = _parse_cached(url)
     except ValueError:
         return False
 
+    return _check_url(parsed, allowed_domains, blacklist_extensions)
+
+
+def _check_url(
+    parsed: SplitResult,
+    allowed_domains: Optional[AbstractSet[str]],
+    blacklist_extensions: Optional[AbstractSet[str]],
+) -> bool:
+    """Apply the scheme, domain and extension checks to a parsed URL, sharing the one parse between them"""
+    # the uncached helpers are used directly, so the public caches aren't filled with (url, parsed) keys
+    if parsed.scheme not in ('http', 'https'):
+        return False
+
+    if allowed_domains:
+        domain = _parsed_domain(parsed)
+
+        if not domain or not _domain_allowed(domain, allowed_domains):
+            return False
+
+    if blacklist_extensions:
+        ext = _path_extension(parsed.path)
+
+        if ext and ext in blacklist_extensions:
+            return False
+
+    return True
+
+
+def _has_opaque_scheme(link: str) -> bool:
+    """Check for an explicit non-HTTP scheme with no '//' authority (mailto:, javascript:, tel:, ...)"""
+    colon = _scheme_length(link)
+    if not colon or link[:colon].lower() in ('http', 'https'):
+        return False
+
+    return not link.startswith('//', colon + 1)
+
+
+def _clean_absolute_url(url: str) -> Optional[str]:
+    """
+    Strip the fragment from an absolute 'http(s)://' URL using plain string operations, producing the same result as
+    a urlsplit round trip. Returns None when the URL needs the full parser (empty host, unsafe/non-ASCII characters).
+    """
+    if not url.isascii() or not _URL_SPECIAL_CHARS.isdisjoint(url):
+        return None
+
+    url = url.partition('#')[0]
+    host_start = url.find('//') + 2
+    if host_start == len(url) or url[host_start] in '/?':
+        return None
+
+    # urlsplit drops an empty query, so a trailing '?' goes too
+    if url.find('?') == len(url) - 1:
+        url = url[:-1]
+    return url
+
+
+def clean_link(link: str) -> str:
+    """Strip surrounding whitespace and the tabs/newlines urlsplit ignores, so checks see the link as it will resolve"""
+    return link.strip().translate(_WS_TABLE)
+
 
 def normalize_url(base_url: str, link: str) -> Optional[str]:
     """Convert a potentially relative link to an absolute URL"""
+    link = clean_link(link)
+
+    # a non-HTTP scheme without an authority can never resolve to a URL with a netloc, so reject it before the join,
+    # and before it takes up a slot in the cache
+    if _has_opaque_scheme(link):
+        return None
+
+    # absolute and protocol-relative links don't depend on the base, so most can skip urljoin entirely
+    if link.startswith('//'):
+        base_scheme = base_url.partition(':')[0]
+        if base_scheme in ('http', 'https'):
+            link = f'{base_scheme}:{link}'
+    if link.startswith(_HTTP_PREFIXES):
+        clean_url = _clean_absolute_url(link)
+        if clean_url:
+            return clean_url
+
+    return _normalize_url(base_url, link)
+
+
+# the same href text recurs across pages (navigation, footers), so memoize the join + parse
+@lru_cache(maxsize=200_000)
+def _normalize_url(base_url: str, link: str) -> Optional[str]:
     try:
-        absolute_url = urljoin(base_url, link.strip())
-        parsed = urlparse(absolute_url)
+        absolute_url = urljoin(base_url, link)
+        parsed = urlsplit(absolute_url)
 
         if not parsed.scheme or not parsed.netloc:
             return None
@@ -75,16 +330,39 @@ def normalize_url(base_url: str, link: str) -> Optional[str]:
         return None
 
 
-def process_blacklist_input(input_value: Optional[str]) -> Optional[List[str]]:
+def _looks_like_path(input_value: str) -> bool:
+    """Check whether blacklist input names a file: it contains a path separator, or is a single 'name.txt' token"""
+    if os.path.sep in input_value:
+        return True
+    # a bare '.txt' is an extension to blacklist, not a file name
+    return (
+        input_value.endswith('.txt') and not input_value.startswith('.') and not _BLACKLIST_SPLIT_RE.search(input_value)
+    )
+
+
+# parsed blacklist files, keyed by (path, st_mtime_ns, st_size)
+_blacklist_file_cache: Dict[Tuple[str, int, int], FrozenSet[str]] = {}
+
+
+def clear_blacklist_cache():
+    """Forget all blacklist files parsed by `process_blacklist_input`, so the next call re-reads them"""
+    _blacklist_file_cache.clear()
+
+
+def process_blacklist_input(input_value: Optional[str]) -> Optional[FrozenSet[str]]:
     """
-    Processes the blacklist input; a comma-separated string of extensions or a path to a file containing them.
+    Processes the blacklist input; a comma/whitespace-separated string of extensions or a path to a file containing
+    them.
+
+    Parsed files are cached until their modification time or size changes; `clear_blacklist_cache()` empties the
+    cache.
 
     Args:
         input_value: The string provided via the --blacklist argument, or None.
 
     Returns:
-        A list of cleaned blacklist extensions (lowercase, starting with '.'), or None if no input_value was provided.
-        Returns an empty list if the input was provided but contained no valid extensions.
+        A frozenset of cleaned, interned blacklist extensions (lowercase, starting with '.'), or None if no input_value
+        was provided. Returns an empty frozenset if the input was provided but contained no valid extensions.
 
     Raises:
         IOError: If input_value looks like a file but cannot be read.
@@ -93,44 +371,51 @@ def process_blacklist_input(input_value: Optional[str]) -> Optional[List[str]]:
     if not input_value:
         return None
 
-    blacklist_items_raw = []
-    processed_extensions_set: Set[str] = set()
-
-    if os.path.exists(input_value) and os.path.isfile(input_value):
-        logger.info(f'Reading blacklist extensions from file: {input_value}')
+    if _looks_like_path(input_value) or os.path.isfile(input_value):
         try:
-            with open(input_value, 'r', encoding='utf-8') as f:
-                content = ''.join(f.readlines())
-                blacklist_items_raw = [item.strip() for item in content.split(',') if item.strip()]
-        except IOError as e:
+            # a changed file gets a new mtime/size, so it's re-read; an unchanged one is never read twice
+            stat = os.stat(input_value)
+            cache_key = (input_value, stat.st_mtime_ns, stat.st_size)
+            if cache_key in _blacklist_file_cache:
+                logger.debug(f'Using cached blacklist extensions for file: {input_value}')
+                return _blacklist_file_cache[cache_key]
+
+            logger.info(f'Reading blacklist extensions from file: {input_value}')
+            # one bulk read; stray undecodable bytes shouldn't abort the crawl
+            with open(input_value, 'r', encoding='utf-8', errors='replace') as f:
+                content = f.read()
+        except FileNotFoundError as e:
+            raise IOError(
+                f"Blacklist argument '{input_value}' looks like a path but file not found! "
+                'Check the path or use a comma-separated string.'
+            ) from e
+        except OSError as e:
             logger.error(f"IOError reading blacklist file '{input_value}': {e}")
             raise IOError(f"Could not read blacklist file '{input_value}'") from e
         except Exception as e:
             logger.error(f"Unexpected error reading file '{input_value}': {e}", exc_info=True)
             raise Exception(f"Failed to process blacklist file '{input_value}'") from e
 
-    else:
-        if os.path.sep in input_value and not os.path.exists(input_value):
-            raise IOError(
-                f"Blacklist argument '{input_value}' looks like a path but file not found! Check the path or use a comma-separated string."
-            )
-        else:
-            logger.info('Processing blacklist extensions from command-line string')
-        try:
-            blacklist_items_raw = [item.strip() for item in input_value.split(',') if item.strip()]
-        except Exception as e:
-            logger.error(f"Unexpected error splitting blacklist string '{input_value}': {e}", exc_info=True)
-            raise ValueError(f"Failed to parse blacklist string '{input_value}'.") from e
-
-    if blacklist_items_raw:
-        for ext in blacklist_items_raw:
-            clean_ext = ext.lower()
-            if not clean_ext.startswith('.'):
-                clean_ext = '.' + clean_ext
-            processed_extensions_set.add(clean_ext)
+        extensions = _parse_blacklist_extensions(content)
+        _blacklist_file_cache[cache_key] = extensions
+        return extensions
+
+    logger.info('Processing blacklist extensions from command-line string')
+    return _parse_blacklist_extensions(input_value)
+
+
+def _parse_blacklist_extensions(content: str) -> FrozenSet[str]:
+    """Split blacklist text into a frozenset of unique, lowercase, dot-prefixed extensions"""
+    # one split handles commas, spaces and newlines alike, and the set comprehension dedupes in the same pass
+    processed_extensions_set = {
+        item if item.startswith('.') else '.' + item for item in _BLACKLIST_SPLIT_RE.split(content.lower()) if item
+    }
+
+    if processed_extensions_set:
         logger.debug(f'Processed blacklist extensions (set): {processed_extensions_set}')
 
-        return sorted(list(processed_extensions_set))
+        # interned, so the crawler's many `ext in blacklist` checks compare equal strings by identity
+        return frozenset(sys.intern(ext) for ext in processed_extensions_set)
     else:
         logger.info('Blacklist input provided, but it resulted in an empty list!')
-        return []
+        return frozenset()
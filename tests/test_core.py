@@ -1,7 +1,11 @@
+import asyncio
+
+import httpx
+import orjson
 import pytest
 
 from crawler import Crawler
-from crawler.constants import DEFAULT_BLACKLIST_EXTENSIONS
+from crawler.constants import DEFAULT_BLACKLIST_EXTENSIONS, DEFAULT_MAX_BODY_BYTES
 
 VALID_START_URL = 'http://example.com'
 
@@ -16,6 +20,8 @@ def test_crawler_init_defaults():
     assert crawler.concurrency == 10
     assert crawler.timeout == 10.0
     assert crawler.verify_ssl is True
+    assert crawler.max_body_bytes == DEFAULT_MAX_BODY_BYTES
+    assert crawler.results_path is None
     assert crawler.headers['User-Agent'].startswith('ASimplePythonCrawler')
 
 
@@ -34,6 +40,8 @@ def test_crawler_init_custom_args():
         timeout=5.5,
         user_agent=user_agent,
         verify_ssl=False,
+        max_body_bytes=1024,
+        results_path='results.ndjson',
     )
     assert crawler.max_depth == 3
     assert crawler.allowed_domains == set(domains)
@@ -42,6 +50,8 @@ def test_crawler_init_custom_args():
     assert crawler.timeout == 5.5
     assert crawler.headers['User-Agent'] == user_agent
     assert crawler.verify_ssl is False
+    assert crawler.max_body_bytes == 1024
+    assert crawler.results_path == 'results.ndjson'
 
 
 def test_crawler_init_empty_blacklist_arg():
@@ -66,3 +76,180 @@ def test_crawler_init_negative_depth():
     """Test Crawler raises ValueError for negative max_depth"""
     with pytest.raises(ValueError, match='max_depth cannot be negative'):
         Crawler(start_url=VALID_START_URL, max_depth=-1)
+
+
+@pytest.mark.parametrize('max_body_bytes', [0, -1])
+def test_crawler_init_invalid_max_body_bytes(max_body_bytes):
+    """Test Crawler raises ValueError for a non-positive max_body_bytes"""
+    with pytest.raises(ValueError, match='max_body_bytes must be positive'):
+        Crawler(start_url=VALID_START_URL, max_body_bytes=max_body_bytes)
+
+
+def test_extract_links_and_title():
+    """Test title and link extraction applies normalization, filtering and per-page dedup"""
+    crawler = Crawler(start_url=VALID_START_URL, allowed_domains=['example.com'], blacklist_extensions=['.jpg'])
+    html = b"""
+        <html><head><title> Example Page </title></head><body>
+        <a href="/about">About</a>
+        <a href="/about#team">About (team)</a>
+        <a href="contact.html">Contact</a>
+        <a href="/photo.jpg">Photo</a>
+        <a href="http://other.com/page">Other</a>
+        <a href="mailto:someone@example.com">Mail</a>
+        <a href="tel:+15555555555">Call</a>
+        <a href="JavaScript:void(0)">Script</a>
+        <a href="#top">Top</a>
+        <a href="/gallery/PHOTO.JPG?size=large">Large photo</a>
+        <a href="/img.j
+pg">Split photo</a>
+        <a href="java	script:void(0)">Split script</a>
+        </body></html>
+    """
+    title, links = crawler._extract_links_and_title(html, 'http://example.com/index.html')
+    assert title == 'Example Page'
+    assert links == ['http://example.com/about', 'http://example.com/contact.html']
+
+
+def test_extract_links_and_title_large_blacklist():
+    """Test blacklists too large for a single regex are filtered through a set lookup instead"""
+    blacklist = [f'.x{i}' for i in range(1000)] + ['.jpg']
+    crawler = Crawler(start_url=VALID_START_URL, blacklist_extensions=blacklist)
+    assert crawler._blacklist_re is None
+    html = (
+        b'<a href="/photo.JPG?size=large">1</a><a href="/data.x999">2</a><a href="/page.html">3</a><a href="/">4</a>'
+        b'<a href="/img.j\npg">5</a>'
+    )
+    _, links = crawler._extract_links_and_title(html, VALID_START_URL)
+    assert links == ['http://example.com/page.html', 'http://example.com/']
+
+
+def test_extract_links_and_title_attribute_forms():
+    """Test hrefs are found regardless of quoting/case, and lookalike attributes are ignored"""
+    crawler = Crawler(start_url=VALID_START_URL)
+    html = b"""
+        <TITLE>Fish &amp; Chips</TITLE>
+        <a class="nav" href='/single'>1</a>
+        <A HREF=/unquoted>2</A>
+        <a data-href="/ignored" href="/search?q=1&amp;page=2">3</a>
+    """
+    title, links = crawler._extract_links_and_title(html, VALID_START_URL)
+    assert title == 'Fish & Chips'
+    assert links == [
+        'http://example.com/single',
+        'http://example.com/unquoted',
+        'http://example.com/search?q=1&page=2',
+    ]
+
+
+def test_extract_links_and_title_encoding():
+    """Test title/href snippets are decoded using the declared charset, falling back to the <meta> declaration"""
+    crawler = Crawler(start_url=VALID_START_URL)
+    html = '<meta charset="iso-8859-1"><title>Café</title><a href="/café">x</a>'.encode('latin-1')
+    expected = ('Café', ['http://example.com/café'])
+    assert crawler._extract_links_and_title(html, VALID_START_URL) == expected
+    assert crawler._extract_links_and_title(html, VALID_START_URL, encoding='latin-1') == expected
+    # an unknown declared charset falls through to the <meta> declaration
+    assert crawler._extract_links_and_title(html, VALID_START_URL, encoding='bogus') == expected
+    assert crawler._extract_links_and_title('<title>Café</title>'.encode(), VALID_START_URL)[0] == 'Café'
+
+
+def test_extract_links_and_title_skips_links():
+    """Test link extraction is skipped when not requested (e.g. at max depth)"""
+    crawler = Crawler(start_url=VALID_START_URL)
+    html = b'<html><head><title>T</title></head><body><a href="/about">About</a></body></html>'
+    assert crawler._extract_links_and_title(html, VALID_START_URL, extract_links=False) == ('T', [])
+
+
+@pytest.fixture
+def mock_http(monkeypatch):
+    """Route the crawler's httpx client through a MockTransport serving the given handler"""
+    real_client = httpx.AsyncClient
+
+    def install(handler):
+        monkeypatch.setattr(
+            httpx, 'AsyncClient', lambda **kwargs: real_client(transport=httpx.MockTransport(handler), **kwargs)
+        )
+
+    return install
+
+
+def test_crawl_streams_results_to_ndjson(tmp_path, mock_http):
+    """Test crawl results are written to the NDJSON sink as one JSON object per line, not kept in memory"""
+    pages = {
+        '/': b'<html><head><title>Home</title></head><body><a href="/about">About</a></body></html>',
+        '/about': b'<html><head><title>About</title></head><body></body></html>',
+    }
+
+    def handler(request):
+        return httpx.Response(
+            200, headers={'content-type': 'text/html; charset=utf-8'}, content=pages[request.url.path]
+        )
+
+    mock_http(handler)
+
+    results_path = tmp_path / 'results.ndjson'
+    crawler = Crawler(start_url='http://example.com/', max_depth=1, results_path=str(results_path))
+    report = asyncio.run(crawler.crawl())
+
+    rows = [orjson.loads(line) for line in results_path.read_bytes().splitlines()]
+    assert sorted((row['url'], row['depth'], row['status_code'], row['title']) for row in rows) == [
+        ('http://example.com/', 0, 200, 'Home'),
+        ('http://example.com/about', 1, 200, 'About'),
+    ]
+    assert report.results == []
+    assert report.stats.total_urls_processed == 2
+
+
+def test_open_results_sink_error(tmp_path):
+    """Test an unwritable results path raises before the crawl starts"""
+    crawler = Crawler(start_url=VALID_START_URL, results_path=str(tmp_path / 'missing' / 'results.ndjson'))
+    with pytest.raises(OSError):
+        crawler.open_results_sink()
+
+
+def test_crawl_truncates_large_html_body(mock_http):
+    """Test HTML bodies are cut off at max_body_bytes, and only the received part is parsed"""
+    body = b'<html><head><title>Big</title></head><body>' + b'x' * 1000 + b'<a href="/late">Late</a></body></html>'
+    mock_http(lambda request: httpx.Response(200, headers={'content-type': 'text/html'}, content=body))
+
+    crawler = Crawler(start_url='http://example.com/', max_depth=1, max_body_bytes=100)
+    report = asyncio.run(crawler.crawl())
+
+    assert [(r.url, r.content_size, r.title) for r in report.results] == [('http://example.com/', 100, 'Big')]
+
+
+def test_crawl_non_html_reports_content_length(mock_http):
+    """Test non-HTML responses aren't downloaded or parsed, and report their Content-Length as the size"""
+    mock_http(lambda request: httpx.Response(200, headers={'content-type': 'application/pdf'}, content=b'%' * 5000))
+
+    crawler = Crawler(start_url='http://example.com/doc', max_body_bytes=100)
+    report = asyncio.run(crawler.crawl())
+
+    assert [(r.url, r.status_code, r.content_size, r.title) for r in report.results] == [
+        ('http://example.com/doc', 200, 5000, None)
+    ]
+
+
+def test_crawl_cancellation_waits_for_tasks(tmp_path, mock_http):
+    """Test cancelling a crawl lets in-flight URL tasks finish unwinding before the results sink is closed"""
+    started = asyncio.Event()
+
+    async def handler(request):
+        started.set()
+        await asyncio.sleep(60)
+
+    mock_http(handler)
+    results_path = tmp_path / 'results.ndjson'
+    crawler = Crawler(start_url='http://example.com/', results_path=str(results_path))
+
+    async def run():
+        crawl_task = asyncio.create_task(crawler.crawl())
+        await started.wait()
+        crawl_task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await crawl_task
+        assert [task for task in asyncio.all_tasks() if task is not asyncio.current_task()] == []
+
+    asyncio.run(run())
+    rows = [orjson.loads(line) for line in results_path.read_bytes().splitlines()]
+    assert [row['url'] for row in rows] == ['http://example.com/']
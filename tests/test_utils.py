@@ -1,101 +1,224 @@
+from urllib.parse import urlsplit
+
 import pytest
 
-from crawler.utils import get_domain, get_extension, is_valid_url, normalize_url, process_blacklist_input
+from crawler.utils import (
+    clear_blacklist_cache,
+    compile_blacklist_pattern,
+    get_domain,
+    get_extension,
+    is_valid_url,
+    is_valid_url_many,
+    normalize_url,
+    process_blacklist_input,
+)
 
 # --- Tests for normalize_url ---
 
-
-@pytest.mark.parametrize(
-    'base, link, expected',
-    [
-        ('http://example.com', '/page', 'http://example.com/page'),
-        ('http://example.com/path/', 'sub', 'http://example.com/path/sub'),
-        ('http://example.com/path/', '../sub', 'http://example.com/sub'),
-        ('http://example.com', 'http://other.com/page', 'http://other.com/page'),
-        ('http://example.com', '//other.com/page', 'http://other.com/page'),
-        ('https://example.com', '//other.com/page', 'https://other.com/page'),
-        ('http://example.com', 'page.html#fragment', 'http://example.com/page.html'),  # Fragment removal
-        ('http://example.com', '?query=1', 'http://example.com?query=1'),  # Query preserved
-        ('http://example.com', 'mailto:a@b.com', None),  # Invalid scheme
-        ('http://example.com', 'javascript:alert(1)', None),  # Invalid scheme
-        ('http://example.com', '', 'http://example.com'),  # Empty link uses base
-        ('http://example.com', '  /path \n', 'http://example.com/path'),  # Whitespace stripping
-    ],
+_NORMALIZE_URL_CASES = (
+    ('http://example.com', '/page', 'http://example.com/page'),
+    ('http://example.com/path/', 'sub', 'http://example.com/path/sub'),
+    ('http://example.com/path/', '../sub', 'http://example.com/sub'),
+    ('http://example.com', 'http://other.com/page', 'http://other.com/page'),
+    ('http://example.com', '//other.com/page', 'http://other.com/page'),
+    ('https://example.com', '//other.com/page', 'https://other.com/page'),
+    ('http://example.com', 'page.html#fragment', 'http://example.com/page.html'),  # Fragment removal
+    ('http://example.com', '?query=1', 'http://example.com?query=1'),  # Query preserved
+    ('http://example.com', 'mailto:a@b.com', None),  # Invalid scheme
+    ('http://example.com', 'javascript:alert(1)', None),  # Invalid scheme
+    ('http://example.com', 'TEL:+15555555555', None),  # Invalid scheme, any case
+    ('http://example.com', 'ftp://files.example.com/a', 'ftp://files.example.com/a'),  # Other schemes with a host
+    ('http://example.com', 'http://other.com/x?#top', 'http://other.com/x'),  # Empty query and fragment dropped
+    ('http://example.com', 'http:///path', 'http://example.com/path'),  # Empty authority resolves against base
+    ('http://example.com/path/', 'http:sub', 'http://example.com/path/sub'),  # Same-scheme relative reference
+    ('http://example.com', '', 'http://example.com'),  # Empty link uses base
+    ('http://example.com', '  /path \n', 'http://example.com/path'),  # Whitespace stripping
+    ('http://example.com', '/pa\tth\n/x', 'http://example.com/path/x'),  # Embedded tabs/newlines removed
+    ('http://example.com', '/a b', 'http://example.com/a b'),  # Embedded spaces kept
 )
-def test_normalize_url(base, link, expected):
-    assert normalize_url(base, link) == expected
 
 
-# --- Tests for get_domain ---
+def test_normalize_url():
+    for base, link, expected in _NORMALIZE_URL_CASES:
+        assert normalize_url(base, link) == expected, (base, link)
+
 
+# --- Tests for get_domain ---
 
-@pytest.mark.parametrize(
-    'url, expected',
-    [
-        ('http://example.com', 'example.com'),
-        ('https://www.example.com/path', 'www.example.com'),
-        ('http://example.com:8080/page?q=1', 'example.com:8080'),
-        ('ftp://ftp.example.com', 'ftp.example.com'),
-        ('http://192.168.1.1/page', '192.168.1.1'),
-        ('invalid-url', None),
-        ('', None),
-    ],
+_DOMAIN_CASES = (
+    ('http://example.com', 'example.com'),
+    ('https://www.example.com/path', 'www.example.com'),
+    ('http://example.com:8080/page?q=1', 'example.com:8080'),
+    ('ftp://ftp.example.com', 'ftp.example.com'),
+    ('http://192.168.1.1/page', '192.168.1.1'),
+    ('http://WWW.Example.COM/Path', 'www.example.com'),  # Lowercased
+    ('invalid-url', None),
+    ('', None),
 )
-def test_get_domain(url, expected):
-    assert get_domain(url) == expected
 
 
-# --- Tests for get_extension ---
+def test_get_domain():
+    for url, expected in _DOMAIN_CASES:
+        assert get_domain(url) == expected, url
+
+
+def test_get_domain_and_extension_preparsed():
+    """Test a pre-parsed URL is used instead of the URL string."""
+    parsed = urlsplit('http://Example.com/file.PDF')
+    assert get_domain('', _parsed=parsed) == 'example.com'
+    assert get_extension('', _parsed=parsed) == '.pdf'
+
+
+def test_get_domain_and_extension_cached():
+    """Test repeat lookups of the same URL are served from the caches."""
+    get_domain.cache_clear()
+    get_extension.cache_clear()
+    for _ in range(3):
+        assert get_domain('http://example.com/a.css') == 'example.com'
+        assert get_extension('http://example.com/a.css') == '.css'
+    assert get_domain.cache_info().hits == 2
+    assert get_extension.cache_info().hits == 2
 
 
-@pytest.mark.parametrize(
-    'url, expected',
-    [
-        ('http://example.com/page.html', '.html'),
-        ('http://example.com/archive.tar.gz', '.gz'),  # Gets last extension
-        ('http://example.com/document.PDF', '.pdf'),  # Lowercase
-        ('http://example.com/noextension', None),
-        ('http://example.com/', None),
-        ('http://example.com/path/.config', None),  # Hidden file is not treated as extension
-        ('http://example.com/page.html?query=1#frag', '.html'),  # Ignores query/fragment
-        ('http://example.com/.', None),  # Just a dot
-    ],
+# --- Tests for get_extension ---
+
+_EXTENSION_CASES = (
+    ('http://example.com/page.html', '.html'),
+    ('http://example.com/archive.tar.gz', '.gz'),  # Gets last extension
+    ('http://example.com/document.PDF', '.pdf'),  # Lowercase
+    ('http://example.com/noextension', None),
+    ('http://example.com/', None),
+    ('http://example.com/path/.config', None),  # Hidden file is not treated as extension
+    ('http://example.com/page.html?query=1#frag', '.html'),  # Ignores query/fragment
+    ('http://example.com/.', None),  # Just a dot
+    ('http://example.com', None),  # Domain is not the path
+    ('http://example.com?file=a.pdf', None),  # Query without a path
+    ('/static/app.JS', '.js'),  # Relative URL
+    ('http://x.com/a.pdf;jsessionid=abc', '.pdf'),  # Ignores ;params on the last segment
+    ('http://example.com/b.com;p=1&.JPG', '.com'),
+    ('http://example.com/a;v=1.2/page', None),  # ;params on earlier segments are part of the path
 )
-def test_get_extension(url, expected):
-    assert get_extension(url) == expected
+
+
+def test_get_extension():
+    for url, expected in _EXTENSION_CASES:
+        assert get_extension(url) == expected, url
 
 
 # --- Tests for is_valid_url ---
 
+ALLOWED = frozenset({'good.com', 'ok.com'})
+ALLOWED_WILDCARD = frozenset({'*.good.com'})
+ALLOWED_GOOD = frozenset({'good.com'})
+BLACKLIST_IMAGES = frozenset({'.jpg', '.png'})
+BLACKLIST_JS = frozenset({'.js'})
+BLACKLIST_JPG = frozenset({'.jpg'})
+
+
+_IS_VALID_URL_CASES = (
+    # Basic valid
+    ('http://example.com/page', None, None, True),
+    ('https://example.com', None, None, True),
+    # Scheme invalid
+    ('ftp://example.com', None, None, False),
+    ('mailto:a@b.com', None, None, False),
+    ('/relative/page', None, None, False),
+    ('HTTPS://example.com/page', None, None, True),  # Scheme is case-insensitive
+    (' http://example.com/page\n', None, None, True),  # Surrounding whitespace tolerated, as by urlsplit
+    ('ht\ttp://example.com/page', None, None, True),
+    ('http:example.com', None, None, False),  # No authority
+    # Domain restriction
+    ('http://good.com/page', ALLOWED, None, True),
+    ('http://bad.com/page', ALLOWED, None, False),
+    ('http://GOOD.com/page', ALLOWED, None, True),  # Host matched case-insensitively
+    ('http://Good.com/', frozenset({'Good.com'}), None, True),  # Filter matched case-insensitively too
+    ('http://www.GOOD.com/', frozenset({'*.Good.COM'}), None, True),
+    ('http://good.com/page', None, None, True),
+    # Wildcard subdomain restriction
+    ('http://www.good.com/page', ALLOWED_WILDCARD, None, True),
+    ('http://a.b.good.com/page', ALLOWED_WILDCARD, None, True),
+    ('http://good.com/page', ALLOWED_WILDCARD, None, False),  # Wildcard doesn't cover the bare domain
+    ('http://notgood.com/page', ALLOWED_WILDCARD, None, False),
+    ('http://good.com.evil.com/page', ALLOWED_WILDCARD, None, False),
+    ('http://www.good.com/page', ALLOWED_GOOD, None, False),  # Exact entries stay exact
+    # Blacklist restriction
+    ('http://example.com/image.jpg', None, BLACKLIST_IMAGES, False),
+    ('http://example.com/page.html', None, BLACKLIST_IMAGES, True),
+    ('http://example.com/script.js', None, BLACKLIST_JS, False),
+    ('http://example.com/noext', None, BLACKLIST_JPG, True),
+    ('http://x.com/a.pdf;jsessionid=abc', None, frozenset({'.pdf'}), False),  # ;params don't hide the extension
+    ('http://example.com/b.com;p=1&.JPG', None, BLACKLIST_JPG, True),
+    # Combined
+    ('http://good.com/image.jpg', ALLOWED_GOOD, BLACKLIST_JPG, False),  # Blacklisted
+    ('http://bad.com/page.html', ALLOWED_GOOD, BLACKLIST_JPG, False),  # Wrong domain
+    ('http://good.com/page.html', ALLOWED_GOOD, BLACKLIST_JPG, True),  # OK
+)
+
 
-@pytest.mark.parametrize(
-    'url, domains, blacklist, expected',
-    [
-        # Basic valid
-        ('http://example.com/page', None, None, True),
-        ('https://example.com', None, None, True),
-        # Scheme invalid
-        ('ftp://example.com', None, None, False),
-        ('mailto:a@b.com', None, None, False),
-        # Domain restriction
-        ('http://good.com/page', {'good.com', 'ok.com'}, None, True),
-        ('http://bad.com/page', {'good.com', 'ok.com'}, None, False),
-        ('http://good.com/page', None, None, True),
-        # Blacklist restriction
-        ('http://example.com/image.jpg', None, {'.jpg', '.png'}, False),
-        ('http://example.com/page.html', None, {'.jpg', '.png'}, True),
-        ('http://example.com/script.js', None, {'.js'}, False),
-        ('http://example.com/noext', None, {'.jpg'}, True),
-        # Combined
-        ('http://good.com/image.jpg', {'good.com'}, {'.jpg'}, False),  # Blacklisted
-        ('http://bad.com/page.html', {'good.com'}, {'.jpg'}, False),  # Wrong domain
-        ('http://good.com/page.html', {'good.com'}, {'.jpg'}, True),  # OK
-    ],
+def test_is_valid_url():
+    for url, domains, blacklist, expected in _IS_VALID_URL_CASES:
+        assert is_valid_url(url, domains, blacklist) == expected, url
+
+
+@pytest.mark.parametrize('domains, blacklist', [(None, None), (ALLOWED, BLACKLIST_IMAGES), ({'good.com'}, {'.jpg'})])
+def test_is_valid_url_many(domains, blacklist):
+    """Test batch validation agrees with is_valid_url for both frozenset and plain set filters."""
+    urls = [
+        'http://good.com/page',
+        'HTTPS://good.com/',
+        ' http://good.com/',
+        'http://good.com/image.jpg',
+        'http://bad.com/page',
+        'ftp://good.com/page',
+        'mailto:a@good.com',
+        '/relative',
+    ]
+    assert is_valid_url_many(urls, domains, blacklist) == [is_valid_url(url, domains, blacklist) for url in urls]
+    assert is_valid_url_many([], domains, blacklist) == []
+
+
+def test_is_valid_url_mutable_set_not_cached():
+    """Test plain sets bypass the result cache, so later changes to them are respected."""
+    domains = {'good.com'}
+    assert is_valid_url('http://other.com/page', domains) is False
+    domains.add('other.com')
+    assert is_valid_url('http://other.com/page', domains) is True
+    domains.add('Mixed.com')
+    assert is_valid_url('http://mixed.COM/page', domains) is True
+
+
+# --- Tests for compile_blacklist_pattern ---
+
+_BLACKLIST_PATTERN_CASES = (
+    ('http://example.com/image.jpg', True),
+    ('http://example.com/IMAGE.JPG', True),  # Case-insensitive
+    ('/relative/file.tar.gz', True),  # Relative links, last extension
+    ('file.tar.bz2', False),  # Only the last extension counts
+    ('http://example.com/page.jpg?size=1#top', True),  # Ignores query/fragment
+    ('http://example.com/page?file=a.jpg', False),  # Extension in the query string only
+    ('http://example.com/page#a.jpg', False),  # Extension in the fragment only
+    ('http://example.com/page.jpgx', False),  # Partial extension
+    ('http://example.com/.jpg', False),  # Hidden file is not treated as extension
+    ('http://example.com/..jpg', False),
+    ('http://example.com/.hidden.jpg', True),
+    ('http://example.com/page.html', False),
+    ('http://example.com/noext', False),
+    ('http://x.com/a.jpg;jsessionid=abc', True),  # Ignores ;params
+    ('http://example.com/b.com;p=1&.JPG', False),  # Extension in the ;params only
+    ('http://example.gz', False),  # Host only, no path
+    ('//cdn.example.gz?x=1', False),  # Protocol-relative host only
 )
-def test_is_valid_url(url, domains, blacklist, expected):
-    allowed_domain_set = set(domains) if domains else None
-    blacklist_set = set(blacklist) if blacklist else None
-    assert is_valid_url(url, allowed_domain_set, blacklist_set) == expected
+
+
+def test_compile_blacklist_pattern():
+    pattern = compile_blacklist_pattern({'.jpg', '.gz', '.tar'})
+    for url, expected in _BLACKLIST_PATTERN_CASES:
+        assert bool(pattern.match(url)) == expected, url
+
+
+def test_compile_blacklist_pattern_empty():
+    assert compile_blacklist_pattern(set()) is None
+    assert compile_blacklist_pattern(['jpg', '.']) is None  # Entries without a leading dot never match extensions
 
 
 # --- Tests for process_blacklist_input ---
@@ -129,20 +252,56 @@ def test_process_blacklist_input_string_mixed():
     assert sorted(result) == ['.css', '.jpeg', '.svg']
 
 
-def test_process_blacklist_input_file_simple(tmp_path):
-    """Test reading from a valid file."""
-    p = tmp_path / 'blacklist.txt'
+def test_process_blacklist_input_string_whitespace_separated():
+    """Test string separated by whitespace instead of commas."""
+    result = process_blacklist_input('.JPG png\t.gif')
+    assert sorted(result) == ['.gif', '.jpg', '.png']
+
+
+@pytest.fixture(scope='session')
+def blacklist_file(tmp_path_factory):
+    """A blacklist file that no test modifies, written once per session."""
+    p = tmp_path_factory.mktemp('blacklist') / 'blacklist.txt'
     p.write_text('.mp4, .mov, .pdf,\n.png')  # Content with newline
-    result = process_blacklist_input(str(p))
+    return p
+
+
+@pytest.fixture(scope='session')
+def empty_blacklist_file(tmp_path_factory):
+    """An empty blacklist file, written once per session."""
+    p = tmp_path_factory.mktemp('blacklist') / 'empty_blacklist.txt'
+    p.write_text('')
+    return p
+
+
+def test_process_blacklist_input_file_simple(blacklist_file):
+    """Test reading from a valid file."""
+    result = process_blacklist_input(str(blacklist_file))
     assert sorted(result) == ['.mov', '.mp4', '.pdf', '.png']
 
 
-def test_process_blacklist_input_file_empty(tmp_path):
+def test_process_blacklist_input_file_empty(empty_blacklist_file):
     """Test reading from an empty file."""
-    p = tmp_path / 'empty_blacklist.txt'
-    p.write_text('')
-    result = process_blacklist_input(str(p))
-    assert result == []
+    result = process_blacklist_input(str(empty_blacklist_file))
+    assert result == frozenset()
+
+
+def test_process_blacklist_input_file_cached(tmp_path, monkeypatch):
+    """Test an unchanged file is only read once, and a modified one is re-read."""
+    clear_blacklist_cache()
+    p = tmp_path / 'cached_blacklist.txt'
+    p.write_text('.mp4, .mov')
+    assert sorted(process_blacklist_input(str(p))) == ['.mov', '.mp4']
+
+    def mock_open(*args, **kwargs):
+        raise AssertionError('cached blacklist file was read again')
+
+    monkeypatch.setattr('crawler.utils.open', mock_open, raising=False)
+    assert sorted(process_blacklist_input(str(p))) == ['.mov', '.mp4']
+    monkeypatch.undo()
+
+    p.write_text('.mp4, .mov, .avi')
+    assert sorted(process_blacklist_input(str(p))) == ['.avi', '.mov', '.mp4']
 
 
 def test_process_blacklist_input_file_not_found():
@@ -151,17 +310,24 @@ def test_process_blacklist_input_file_not_found():
         process_blacklist_input('./nonexistent/file.txt')
 
 
+def test_process_blacklist_input_txt_file_not_found(tmp_path, monkeypatch):
+    """Test a bare '.txt' file name is treated as a path, while a '.txt' extension is not."""
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(IOError, match='looks like a path but file not found'):
+        process_blacklist_input('missing.txt')
+    assert sorted(process_blacklist_input('.txt, .log')) == ['.log', '.txt']
+
+
 def test_process_blacklist_input_file_read_error(tmp_path, monkeypatch):
     """Test handling of file read errors."""
     p = tmp_path / 'unreadable.txt'
     p.touch()
 
     def mock_open(*args, **kwargs):
-        if args[0] == str(p):
-            raise IOError('Permission denied (mocked)')
-        return open(*args, **kwargs)
+        raise IOError('Permission denied (mocked)')
 
-    monkeypatch.setattr('builtins.open', mock_open)
+    # shadow open() in the module under test only, leaving builtins (and pytest's own file access) untouched
+    monkeypatch.setattr('crawler.utils.open', mock_open, raising=False)
 
     with pytest.raises(IOError, match='Could not read blacklist file'):
         process_blacklist_input(str(p))